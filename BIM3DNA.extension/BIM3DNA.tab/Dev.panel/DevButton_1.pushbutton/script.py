@@ -7,7 +7,8 @@ Description:
 
 This integrated script lets you:
   1. Select boundary detail lines that form a closed loop.
-  2. Gather all elements in the active view whose bounding-box center is inside the boundary.
+  2. Gather the pipes, fittings, pipe tags and text notes in the active view whose
+     bounding-box center is inside the boundary.
   3. Filter the gathered elements to only those in the categories of interest 
      (Pipes, Pipe Fittings, Pipe Tags, Text Notes).
   4. Display an editable grid so you can adjust the associated prefab (Comments) codes.
@@ -28,26 +29,36 @@ Author: Emin Avdovic"""
 # ==================================================
 # Imports
 # ==================================================
-from Autodesk.Revit.DB import *
 from Autodesk.Revit.DB import (
     FamilySymbol,
     FilteredElementCollector,
     FormatOptions,
     BuiltInCategory,
     BuiltInParameter,
+    Element,
     ElementId,
+    ElementMulticategoryFilter,
+    BoundingBoxIntersectsFilter,
+    LogicalAndFilter,
+    LogicalOrFilter,
+    Outline,
+    BoundingBoxXYZ,
     XYZ,
     Transaction,
+    SubTransaction,
     TextNote,
     TextNoteType,
     TextNoteOptions,
     IndependentTag,
-    UV,
     UnitTypeId,
     Reference,
     TagMode,
     TagOrientation,
     ViewSchedule,
+    View3D,
+    ViewFamily,
+    ViewFamilyType,
+    ViewType,
     ViewSheet,
     ViewDuplicateOption,
     ViewDiscipline,
@@ -66,6 +77,7 @@ from Autodesk.Revit.DB import (
     ScheduleSortOrder,
     SectionType,
     Category,
+    StorageType,
 )
 from Autodesk.Revit.UI.Selection import ObjectType, ISelectionFilter
 from Autodesk.Revit.UI import *
@@ -94,13 +106,17 @@ from System.Windows.Forms import (
     AutoScaleMode,
     Form,
     ComboBox,
-    ListBox,
+    ListView,
+    ListViewItem,
+    ColumnHeaderStyle,
     PictureBox,
     PictureBoxSizeMode,
     DataGridView,
+    DataGridViewColumnSortMode,
     DataGridViewTextBoxColumn,
     DataGridViewButtonColumn,
     DataGridViewAutoSizeColumnsMode,
+    DataGridViewAutoSizeColumnMode,
     DockStyle,
     TextBox,
     Button,
@@ -108,13 +124,18 @@ from System.Windows.Forms import (
     DialogResult,
     Label,
     ScrollBars,
+    SortOrder,
     Application,
 )
 from System.Drawing import Image, Point, Color, Rectangle, Size
 from System.IO import MemoryStream
 from System.Windows.Forms import DataGridViewButtonColumn
+from System.Windows.Forms import View as ListViewMode
 from System import Array
+from System.Reflection import BindingFlags
 import math, re, sys
+from collections import defaultdict, namedtuple
+from operator import itemgetter
 
 # ==================================================
 # Revit Document Setup
@@ -129,47 +150,93 @@ doc = __revit__.ActiveUIDocument.Document
 
 
 # --- Boundary Selection Functions ---
+# categories collected from the active view; everything else is pruned by Revit
+# model categories can also be pruned by extent; annotations have no model extent
+MODEL_CATEGORIES = [
+    BuiltInCategory.OST_PipeCurves,
+    BuiltInCategory.OST_PipeFitting,
+]
+ANNOTATION_CATEGORIES = [
+    BuiltInCategory.OST_PipeTags,
+    BuiltInCategory.OST_TextNotes,
+]
+PIPE_CAT_ID = int(BuiltInCategory.OST_PipeCurves)
+
+# vertical reach of the extent filter; the boundary itself is 2D
+OUTLINE_HALF_HEIGHT = 1e6
+
+# boundary result: every element inside, plus the pipes among them
+GatheredElements = namedtuple("GatheredElements", ["elements", "pipes"])
+
+
 class DetailLineSelectionFilter(ISelectionFilter):
+    _OST_LINES = int(BuiltInCategory.OST_Lines)
+
     def AllowElement(self, elem):
-        if elem.Category and elem.Category.Id.IntegerValue == int(
-            BuiltInCategory.OST_Lines
-        ):
-            return True
-        return False
+        cat = elem.Category
+        return cat is not None and cat.Id.IntegerValue == self._OST_LINES
 
     def AllowReference(self, ref, point):
         return False
 
 
-def points_are_close(pt1, pt2, tol=1e-6):
-    return (
-        abs(pt1.X - pt2.X) < tol
-        and abs(pt1.Y - pt2.Y) < tol
-        and abs(pt1.Z - pt2.Z) < tol
-    )
+# endpoint matching tolerance (feet) and its square for distance checks
+CLOSE_TOL = 1e-6
+CLOSE_TOL2 = CLOSE_TOL * CLOSE_TOL
+
+
+def points_are_close(pt1, pt2, tol2=CLOSE_TOL2):
+    dx = pt1.X - pt2.X
+    dy = pt1.Y - pt2.Y
+    dz = pt1.Z - pt2.Z
+    return dx * dx + dy * dy + dz * dz < tol2
+
+
+def endpoint_key(pt, tol=CLOSE_TOL):
+    """Quantize a point onto a tol-sized grid so equal endpoints hash together."""
+    return (int(round(pt.X / tol)), int(round(pt.Y / tol)), int(round(pt.Z / tol)))
 
 
 def order_segments_to_polygon(segments):
     if not segments:
         return None
+    n = len(segments)
+
+    # index every segment under both of its endpoints
+    adj = defaultdict(list)
+    for idx, (ptA, ptB) in enumerate(segments):
+        adj[endpoint_key(ptA)].append(idx)
+        adj[endpoint_key(ptB)].append(idx)
+
+    # visited flags; the segment list itself is never mutated
+    used = bytearray(n)
+    used[0] = 1
     polygon = [segments[0][0], segments[0][1]]
-    segments.pop(0)
-    changed = True
-    while segments and changed:
-        changed = False
+    while True:
         last_pt = polygon[-1]
-        for idx, seg in enumerate(segments):
-            ptA, ptB = seg
-            if points_are_close(last_pt, ptA):
-                polygon.append(ptB)
-                segments.pop(idx)
-                changed = True
-                break
-            elif points_are_close(last_pt, ptB):
-                polygon.append(ptA)
-                segments.pop(idx)
-                changed = True
+        nxt = None
+        for idx in adj.get(endpoint_key(last_pt), ()):
+            if not used[idx]:
+                nxt = idx
                 break
+        if nxt is None:
+            # points within tol can still round into neighbouring grid cells
+            for idx in range(n):
+                if not used[idx] and (
+                    points_are_close(last_pt, segments[idx][0])
+                    or points_are_close(last_pt, segments[idx][1])
+                ):
+                    nxt = idx
+                    break
+        if nxt is None:
+            break
+        used[nxt] = 1
+        ptA, ptB = segments[nxt]
+        if points_are_close(last_pt, ptA):
+            polygon.append(ptB)
+        else:
+            polygon.append(ptA)
+
     if polygon and points_are_close(polygon[0], polygon[-1]):
         polygon.pop()
         return polygon
@@ -177,26 +244,157 @@ def order_segments_to_polygon(segments):
         return None
 
 
-def is_point_inside_polygon(point, polygon):
-    x = point.X
-    y = point.Y
-    inside = False
-    n = len(polygon)
-    j = n - 1
+def polygon_to_soa(polygon):
+    """Split polygon vertices into separate X and Y lists."""
+    return [p.X for p in polygon], [p.Y for p in polygon]
+
+
+def build_edge_rows(px, py):
+    """Bucket polygon edges into horizontal bands by the Y-range they span.
+
+    Returns (min_y, row_height, rows) where rows[r] lists the (xi, yi, yj, slope)
+    edges that can be crossed by a horizontal ray inside band r. The slope is
+    dx/dy of the edge, precomputed so the per-point test needs no division.
+    Build it once per boundary and pass it to every points_inside_polygon call.
+    """
+    # large boundaries get more bands so each point only visits nearby edges
+    n_rows = min(32, max(1, len(px) // 4))
+    min_y = min(py)
+    row_h = ((max(py) - min_y) or 1.0) / n_rows
+    rows = [[] for _ in range(n_rows)]
+    for i in range(len(px)):
+        xi, yi, xj, yj = px[i], py[i], px[i - 1], py[i - 1]
+        edge = (xi, yi, yj, (xj - xi) / ((yj - yi) or 1e-12))
+        lo = int((min(yi, yj) - min_y) / row_h)
+        hi = min(int((max(yi, yj) - min_y) / row_h), n_rows - 1)
+        for r in range(lo, hi + 1):
+            rows[r].append(edge)
+    return min_y, row_h, rows
+
+
+def points_inside_polygon(cx, cy, edge_rows):
+    """Crossing-number test for a batch of points against one polygon.
+
+    cx/cy hold the query coordinates, edge_rows the polygon's banded edge
+    table from build_edge_rows. Returns one boolean per query point.
+    """
+    min_y, row_h, rows = edge_rows
+    n_rows = len(rows)
+    result = []
+    for x, y in zip(cx, cy):
+        r = int((y - min_y) / row_h) if y >= min_y else -1
+        if r >= n_rows:
+            r = n_rows - 1
+        inside = False
+        if r >= 0:
+            for xi, yi, yj, slope in rows[r]:
+                if ((yi > y) != (yj > y)) and x < slope * (y - yi) + xi:
+                    inside = not inside
+        result.append(inside)
+    return result
+
+
+def polygon_is_convex(px, py):
+    """True when every turn of the polygon has the same orientation."""
+    sign = 0
+    n = len(px)
     for i in range(n):
-        xi = polygon[i].X
-        yi = polygon[i].Y
-        xj = polygon[j].X
-        yj = polygon[j].Y
-        if ((yi > y) != (yj > y)) and (
-            x < (xj - xi) * (y - yi) / ((yj - yi) or 1e-12) + xi
-        ):
-            inside = not inside
-        j = i
-    return inside
-
-
-def select_boundary_and_gather():
+        cross = (px[i - 1] - px[i - 2]) * (py[i] - py[i - 1]) - (
+            py[i - 1] - py[i - 2]
+        ) * (px[i] - px[i - 1])
+        if cross == 0:
+            continue
+        if sign == 0:
+            sign = 1 if cross > 0 else -1
+        elif (cross > 0) != (sign > 0):
+            return False
+    return True
+
+
+def get_crop_extent_inside_polygon(view, edge_rows, convex):
+    """XY extent of the view crop when it lies wholly inside a convex boundary.
+
+    Returns (min_x, min_y, max_x, max_y) in model coordinates, or None when the
+    crop is off, the boundary is concave, or the crop pokes outside it.
+    """
+    if not view.CropBoxActive or not convex:
+        return None
+    crop = view.CropBox
+    tr = crop.Transform
+    corners = [
+        tr.OfPoint(XYZ(x, y, crop.Min.Z))
+        for x in (crop.Min.X, crop.Max.X)
+        for y in (crop.Min.Y, crop.Max.Y)
+    ]
+    xs = [c.X for c in corners]
+    ys = [c.Y for c in corners]
+    extent = (min(xs), min(ys), max(xs), max(ys))
+    ex = [extent[0], extent[2], extent[2], extent[0]]
+    ey = [extent[1], extent[1], extent[3], extent[3]]
+    if not all(points_inside_polygon(ex, ey, edge_rows)):
+        return None
+    return extent
+
+
+def get_inner_rectangle(px, py, edge_rows, convex):
+    """Axis-aligned rectangle that lies inside a convex boundary, or None.
+
+    The boundary's own extent is shrunk toward the vertex centroid until all
+    four corners pass the polygon test; for a convex polygon that guarantees
+    the whole rectangle is inside. Returns (min_x, min_y, max_x, max_y).
+    """
+    if not convex:
+        return None
+    n = float(len(px))
+    cx = sum(px) / n
+    cy = sum(py) / n
+    min_x, max_x, min_y, max_y = min(px), max(px), min(py), max(py)
+    for t in (0.999, 0.9, 0.8, 0.7, 0.6, 0.5, 0.4, 0.3, 0.2, 0.1):
+        rect = (
+            cx + (min_x - cx) * t,
+            cy + (min_y - cy) * t,
+            cx + (max_x - cx) * t,
+            cy + (max_y - cy) * t,
+        )
+        ex = [rect[0], rect[2], rect[2], rect[0]]
+        ey = [rect[1], rect[1], rect[3], rect[3]]
+        if all(points_inside_polygon(ex, ey, edge_rows)):
+            return rect
+    return None
+
+
+def get_cached_bbox(elem, view, bbox_cache):
+    """Return (extent, center) for elem, calling Revit only on a cache miss.
+
+    extent is a (min_x, min_y, min_z, max_x, max_y, max_z) tuple and center
+    a plain (x, y, z) tuple, so cache hits never touch the Revit API. Both
+    are None when the element has no bounding box in the view.
+    """
+    key = elem.Id.IntegerValue
+    entry = bbox_cache.get(key)
+    if entry is None:
+        bbox = elem.get_BoundingBox(view)
+        extent = center = None
+        if bbox:
+            bmin = bbox.Min
+            bmax = bbox.Max
+            extent = (bmin.X, bmin.Y, bmin.Z, bmax.X, bmax.Y, bmax.Z)
+            center = (
+                (extent[0] + extent[3]) * 0.5,
+                (extent[1] + extent[4]) * 0.5,
+                (extent[2] + extent[5]) * 0.5,
+            )
+        entry = (extent, center)
+        bbox_cache[key] = entry
+    return entry
+
+
+def select_boundary_and_gather(bbox_cache):
+    """Pick a closed detail-line boundary and gather the elements inside it.
+
+    Returns (GatheredElements, stats) or (None, None) when cancelled. UI
+    feedback about the result is left to the caller.
+    """
     try:
         selection_refs = uidoc.Selection.PickObjects(
             ObjectType.Element,
@@ -204,9 +402,9 @@ def select_boundary_and_gather():
             "Select boundary detail lines (click on the lines that form a closed loop)",
         )
     except Exception:
-        return None
+        return None, None
     if not selection_refs:
-        return None
+        return None, None
 
     segments = []
     for ref in selection_refs:
@@ -224,128 +422,267 @@ def select_boundary_and_gather():
         MessageBox.Show(
             "The selected detail lines do not form a closed boundary.", "Error"
         )
-        return None
-
+        return None, None
+
+    px, py = polygon_to_soa(polygon)
+
+    # polygon extent, used to reject far-away centers before the ray-cast
+    poly_min_x = min(px)
+    poly_max_x = max(px)
+    poly_min_y = min(py)
+    poly_max_y = max(py)
+
+    view = uidoc.ActiveView
+    # pipes and fittings outside the boundary's extent are rejected by Revit
+    # before Python sees them; tags and notes only go through the category test
+    extent = Outline(
+        XYZ(poly_min_x, poly_min_y, -OUTLINE_HALF_HEIGHT),
+        XYZ(poly_max_x, poly_max_y, OUTLINE_HALF_HEIGHT),
+    )
+    model_filter = LogicalAndFilter(
+        ElementMulticategoryFilter(List[BuiltInCategory](MODEL_CATEGORIES)),
+        BoundingBoxIntersectsFilter(extent),
+    )
+    annotation_filter = ElementMulticategoryFilter(
+        List[BuiltInCategory](ANNOTATION_CATEGORIES)
+    )
     collector = (
-        FilteredElementCollector(doc, uidoc.ActiveView.Id)
+        FilteredElementCollector(doc, view.Id)
+        .WherePasses(LogicalOrFilter(model_filter, annotation_filter))
         .WhereElementIsNotElementType()
         .ToElements()
     )
-    elements_inside = []
+    # the edge table and convexity are worked out once for every polygon test
+    edge_rows = build_edge_rows(px, py)
+    convex = polygon_is_convex(px, py)
+    # centers inside either rectangle are inside the boundary without a ray-cast
+    crop_extent = get_crop_extent_inside_polygon(view, edge_rows, convex)
+    inner_rect = get_inner_rectangle(px, py, edge_rows, convex)
+
+    # gather candidate centers first, then test the undecided ones in one batch
+    candidates, inside_flags, pending, cx, cy = [], [], [], [], []
+    # local aliases keep the hot loop on fast local lookups
+    _bbox_of = get_cached_bbox
+    _pending_add = pending.append
+    _flag = inside_flags.append
     for elem in collector:
-        bbox = elem.get_BoundingBox(uidoc.ActiveView)
-        if bbox:
-            center = XYZ(
-                (bbox.Min.X + bbox.Max.X) / 2.0,
-                (bbox.Min.Y + bbox.Max.Y) / 2.0,
-                (bbox.Min.Z + bbox.Max.Z) / 2.0,
-            )
-            if is_point_inside_polygon(center, polygon):
-                elements_inside.append(elem)
-
+        extent, center = _bbox_of(elem, view, bbox_cache)
+        if extent:
+            x, y = center[0], center[1]
+            if not (poly_min_x <= x <= poly_max_x and poly_min_y <= y <= poly_max_y):
+                continue
+            if (
+                inner_rect
+                and inner_rect[0] <= x <= inner_rect[2]
+                and inner_rect[1] <= y <= inner_rect[3]
+            ) or (
+                crop_extent
+                and crop_extent[0] <= x <= crop_extent[2]
+                and crop_extent[1] <= y <= crop_extent[3]
+            ):
+                _flag(True)
+            else:
+                _flag(False)
+                _pending_add(len(candidates))
+                cx.append(x)
+                cy.append(y)
+            candidates.append(elem)
+
+    for i, ok in zip(pending, points_inside_polygon(cx, cy, edge_rows)):
+        inside_flags[i] = ok
+    # pick out the pipes in the same pass, comparing category ints
+    gathered = GatheredElements(List[Element](len(candidates)), List[Element]())
+    add = gathered.elements.Add
+    add_pipe = gathered.pipes.Add
+    for e, ok in zip(candidates, inside_flags):
+        if ok:
+            add(e)
+            if e.Category.Id.IntegerValue == PIPE_CAT_ID:
+                add_pipe(e)
+
+    stats = {"inside": gathered.elements.Count}
+    return gathered, stats
+
+
+def notify_gather_stats(stats):
+    """Report the boundary result once; an empty result is reported by the caller."""
+    if not stats or not stats["inside"]:
+        return
     MessageBox.Show(
-        "Found {0} element(s) inside the selected boundary.".format(
-            len(elements_inside)
-        ),
+        "Found {0} element(s) inside the selected boundary.".format(stats["inside"]),
         "Boundary Selection",
     )
-    return elements_inside
 
 
 # --- Parameter and Region Helpers ---
+MM_PER_FOOT = 304.8
+# first dotted number in a text-note code, e.g. "4.1.1" in "WC 4.1.1";
+# it must start with a digit so a stray "." is never taken as the code
+BASE_CODE_RE = re.compile(r"(\d[\d.]*)")
+
+
 def convert_param_to_string(param_obj):
     if not param_obj:
         return ""
-    try:
-        val_str = param_obj.AsValueString()
-        if val_str and val_str.strip() != "":
-            return val_str
-    except Exception:
-        pass
-    try:
-        val_double = param_obj.AsDouble()
-        val_mm = val_double * 304.8
-        return str(int(round(val_mm))) + " mm"
-    except Exception:
-        return ""
-
-
-def get_region_bounding_box(elements):
-    valid_found = False
-    overall_min_x = float("inf")
-    overall_min_y = float("inf")
-    overall_min_z = float("inf")
-    overall_max_x = float("-inf")
-    overall_max_y = float("-inf")
-    overall_max_z = float("-inf")
+    val_str = param_obj.AsValueString()
+    if val_str and val_str.strip() != "":
+        return val_str
+    # only length-like doubles get the millimetre fallback
+    if param_obj.StorageType == StorageType.Double:
+        return str(int(round(param_obj.AsDouble() * MM_PER_FOOT))) + " mm"
+    return ""
+
+
+def get_region_bounding_box(elements, bbox_cache=None):
+    if bbox_cache is None:
+        bbox_cache = {}
+    view = uidoc.ActiveView
+    _isinf = math.isinf
+    _bbox_of = get_cached_bbox
+    # one coordinate list per axis, reduced by the builtin min/max at the end
+    min_xs, min_ys, min_zs = [], [], []
+    max_xs, max_ys, max_zs = [], [], []
 
     for el in elements:
         try:
-            bbox = el.get_BoundingBox(uidoc.ActiveView)
+            extent = _bbox_of(el, view, bbox_cache)[0]
         except:
             continue  # skip if element was just deleted
-        if not bbox:
-            continue
-        if bbox is None:
+        if not extent:
             continue
-        if (
-            bbox.Min.X == float("inf")
-            or bbox.Min.Y == float("inf")
-            or bbox.Min.Z == float("inf")
-        ):
+        bmnx, bmny, bmnz, bmxx, bmxy, bmxz = extent
+        if _isinf(bmnx) or _isinf(bmny) or _isinf(bmnz):
             continue
-        valid_found = True
-        overall_min_x = min(overall_min_x, bbox.Min.X)
-        overall_min_y = min(overall_min_y, bbox.Min.Y)
-        overall_min_z = min(overall_min_z, bbox.Min.Z)
-        overall_max_x = max(overall_max_x, bbox.Max.X)
-        overall_max_y = max(overall_max_y, bbox.Max.Y)
-        overall_max_z = max(overall_max_z, bbox.Max.Z)
-
-    if not valid_found:
+        min_xs.append(bmnx)
+        min_ys.append(bmny)
+        min_zs.append(bmnz)
+        max_xs.append(bmxx)
+        max_ys.append(bmxy)
+        max_zs.append(bmxz)
+
+    if not min_xs:
         return XYZ(0, 0, 0), XYZ(0, 0, 0)
 
-    overall_min = XYZ(overall_min_x, overall_min_y, overall_min_z)
-    overall_max = XYZ(overall_max_x, overall_max_y, overall_max_z)
+    overall_min = XYZ(min(min_xs), min(min_ys), min(min_zs))
+    overall_max = XYZ(max(max_xs), max(max_ys), max(max_zs))
     return overall_min, overall_max
 
 
-def create_pipe_tags_for_untagged_pipes(doc, pipes, view):
-    t = Transaction(doc, "Add Missing Pipe Tags")
+def add_tags_bulk(doc, view, hosts, bbox_cache, name="Add Tags"):
+    """
+    Tag every host at its bounding-box center inside one transaction.
+    Returns [(host, tag)] for the hosts that have a bounding box in view.
+    """
+    # build references up front so the transaction only holds the tag creation
+    work = []
+    for host in hosts:
+        center = get_cached_bbox(host, view, bbox_cache)[1]
+        if center:
+            work.append((host, Reference(host), XYZ(*center)))
+    created = []
+    if not work:
+        return created
+    t = Transaction(doc, name)
     t.Start()
-    for pipe in pipes:
-        bbox = pipe.get_BoundingBox(view)
-        if not bbox:
-            continue
-        center = XYZ(
-            (bbox.Min.X + bbox.Max.X) / 2.0,
-            (bbox.Min.Y + bbox.Max.Y) / 2.0,
-            (bbox.Min.Z + bbox.Max.Z) / 2.0,
-        )
-        pipe_ref = Reference(pipe)
-        IndependentTag.Create(
+    for host, host_ref, point in work:
+        tag = IndependentTag.Create(
             doc,
             view.Id,
-            pipe_ref,
+            host_ref,
             True,
             TagMode.TM_ADDBY_CATEGORY,
             TagOrientation.Horizontal,
-            UV(center.X, center.Y),
+            point,
         )
+        created.append((host, tag))
     t.Commit()
+    return created
+
+
+def create_pipe_tags_for_untagged_pipes(doc, pipes, view, bbox_cache=None):
+    if bbox_cache is None:
+        bbox_cache = {}
+    add_tags_bulk(doc, view, pipes, bbox_cache, "Add Missing Pipe Tags")
 
 
 # ==================================================
 # UI Class: ElementEditorForm
 # ==================================================
+# editor grid columns in display order; the form's per-column lists follow it
+GRID_COLUMNS = (
+    "Id",
+    "Category",
+    "Name",
+    "DefaultCode",
+    "NewCode",
+    "OutsideDiameter",
+    "Length",
+    "Size",
+    "GEB_Article_Number",
+    "TagStatus",
+)
+GRID_COLUMN_WIDTHS = {
+    "Id": 80,
+    "Category": 100,
+    "DefaultCode": 90,
+    "NewCode": 90,
+    "OutsideDiameter": 100,
+    "Length": 80,
+    "Size": 80,
+    "GEB_Article_Number": 110,
+    "TagStatus": 100,
+}
+COL_ID = GRID_COLUMNS.index("Id")
+COL_CATEGORY = GRID_COLUMNS.index("Category")
+COL_NEW_CODE = GRID_COLUMNS.index("NewCode")
+COL_TAG_STATUS = GRID_COLUMNS.index("TagStatus")
+# extra backing list after the grid columns: per-row read-only flag of the
+# TagStatus button; it is sorted and removed together with the row values
+COL_TAG_LOCKED = len(GRID_COLUMNS)
+
+# quiet time after the last row change before the element is selected in Revit
+SELECTION_DEBOUNCE_MS = 120
+
+# categories whose rows carry an Add/Remove tag button
+TAGGABLE_CATEGORIES = frozenset(("Pipes", "Pipe Fittings"))
+
+# initial TagStatus button text per category: (already tagged, untagged)
+TAG_LABELS = {
+    "Pipes": ("Remove Tag", "Add/Place Tag"),
+    "Pipe Tags": ("Remove Tag", "Remove Tag"),
+}
+
+
+class ElementRecord(object):
+    """One editor row as gathered from the model; fields follow GRID_COLUMNS."""
+
+    __slots__ = GRID_COLUMNS
+
+    def __init__(self, **fields):
+        for name in GRID_COLUMNS:
+            setattr(self, name, fields.get(name, ""))
+
+
+CATEGORY_COLORS = {
+    "Pipes": Color.LightBlue,
+    "Pipe Tags": Color.LightGreen,
+    "Pipe Fittings": Color.LightGoldenrodYellow,
+    "Text Notes": Color.LightGray,
+}
+
+
 class ElementEditorForm(Form):
-    def __init__(self, elements_data, region_elements=None):
+    def __init__(
+        self, elements_data, region_elements=None, bbox_cache=None, tags_by_host=None
+    ):
         self.Text = "Edit Element Codes"
         self.Width = 950
         self.Height = 500
         self.MinimumSize = Size(700, 400)
         self.SuspendLayout()
         self.regionElements = region_elements
+        self.bboxCache = bbox_cache if bbox_cache is not None else {}
+        self.tagsByHost = tags_by_host if tags_by_host is not None else {}
 
         # --- 1. Bottom Buttons Panel FIRST
         self.buttonPanel = System.Windows.Forms.Panel()
@@ -359,9 +696,17 @@ class ElementEditorForm(Form):
         self.Controls.Add(self.gridPanel)
 
         self.dataGrid = DataGridView()
+        # DoubleBuffered is protected on DataGridView; set it through reflection
+        # so selection changes and bulk edits repaint without flicker
+        self.dataGrid.GetType().GetProperty(
+            "DoubleBuffered", BindingFlags.NonPublic | BindingFlags.Instance
+        ).SetValue(self.dataGrid, True, None)
         self.dataGrid.SelectionChanged += self.on_row_selected
         self.dataGrid.Dock = DockStyle.Fill
-        self.dataGrid.AutoSizeColumnsMode = DataGridViewAutoSizeColumnsMode.Fill
+        # fixed widths; only the Name column fills, so no content is measured
+        self.dataGrid.AutoSizeColumnsMode = getattr(
+            DataGridViewAutoSizeColumnsMode, "None"
+        )
         self.dataGrid.CellContentClick += self.dataGrid_CellContentClick
         self.gridPanel.Controls.Add(self.dataGrid)
 
@@ -433,6 +778,12 @@ class ElementEditorForm(Form):
         self.dataGrid.Columns.Add(self.colArticle)
         self.dataGrid.Columns.Add(self.colTagStatus)
 
+        for col in self.dataGrid.Columns:
+            col.AutoSizeMode = getattr(DataGridViewAutoSizeColumnMode, "None")
+            col.Width = GRID_COLUMN_WIDTHS.get(col.Name, 100)
+        self.colName.AutoSizeMode = DataGridViewAutoSizeColumnMode.Fill
+        self.colName.MinimumWidth = 120
+
         # --- 4. Buttons inside buttonPanel
         self.btnPlaceTextNote = Button()
         self.btnPlaceTextNote.Text = "Place Text Note"
@@ -475,45 +826,116 @@ class ElementEditorForm(Form):
         # --- 6. State
         self.textNotePlaced = False
         self.Result = None
+        self._pendingId = None
+        self._selTimer = System.Windows.Forms.Timer()
+        self._selTimer.Interval = SELECTION_DEBOUNCE_MS
+        self._selTimer.Tick += self._flush_selection
+        self.FormClosed += lambda sender, event: self._selTimer.Dispose()
 
         # --- 7. Populate Rows
+        # The grid runs in VirtualMode: values live in one list per column
+        # (self._data[column_index][row_index]) and the grid only asks for
+        # the cells it actually displays.
+        self._data = [[] for _ in GRID_COLUMNS] + [[]]
+        self._row_index = None
         for ed in elements_data:
-            row_idx = self.dataGrid.Rows.Add()
-            row = self.dataGrid.Rows[row_idx]
-            row.Cells["Id"].Value = ed["Id"]
-            row.Cells["Category"].Value = ed["Category"]
-            row.Cells["Name"].Value = ed["Name"]
-            row.Cells["GEB_Article_Number"].Value = ed.get("GEB_Article_Number", "")
-            row.Cells["DefaultCode"].Value = ed["DefaultCode"]
-            row.Cells["NewCode"].Value = ed["NewCode"]
-            row.Cells["OutsideDiameter"].Value = ed["OutsideDiameter"]
-            row.Cells["Length"].Value = ed["Length"]
-            row.Cells["Size"].Value = ed.get("Size", "")
-
-            # TagStatus logic
-            cat = ed["Category"]
-            status = ed["TagStatus"]
-            if cat == "Pipes":
-                if status == "Yes":
-                    row.Cells["TagStatus"].Value = "Remove Tag"
-                else:
-                    row.Cells["TagStatus"].Value = "Add/Place Tag"
-            elif cat == "Pipe Tags":
-                row.Cells["TagStatus"].Value = "Remove Tag"
-            elif cat == "Pipe Fittings":
-                row.Cells["TagStatus"].Value = ""
-                row.Cells["TagStatus"].ReadOnly = True
-            else:
-                row.Cells["TagStatus"].Value = ""
+            labels = TAG_LABELS.get(ed.Category)
+            tag_label = labels[ed.TagStatus != "Yes"] if labels else ""
+            # fittings get no tag button of their own
+            self._append_record(ed, tag_label, ed.Category == "Pipe Fittings")
+
+        grid = self.dataGrid
+        grid.AllowUserToAddRows = False
+        for col in grid.Columns:
+            col.SortMode = DataGridViewColumnSortMode.Programmatic
+        grid.CellValueNeeded += self._on_cell_value_needed
+        grid.CellValuePushed += self._on_cell_value_pushed
+        grid.CellFormatting += self._on_cell_formatting
+        grid.CellBeginEdit += self._on_cell_begin_edit
+        grid.RowsRemoved += self._on_rows_removed
+        grid.ColumnHeaderMouseClick += self._on_column_header_click
+        grid.VirtualMode = True
+        # all rows are allocated in one call, with a single layout pass after
+        grid.SuspendLayout()
+        try:
+            grid.RowCount = len(elements_data)
+        finally:
+            grid.ResumeLayout(False)
+            grid.PerformLayout()
+
+    # --- VirtualMode backing store
+    def _append_record(self, record, tag_label, tag_locked=False):
+        """Append one ElementRecord's values to the per-column lists."""
+        for name, values in zip(GRID_COLUMNS, self._data):
+            values.append(getattr(record, name))
+        self._data[COL_TAG_STATUS][-1] = tag_label
+        self._data[COL_TAG_LOCKED].append(tag_locked)
+        self._row_index = None
+
+    def _find_row(self, elem_id, categories):
+        """
+        Row index of elem_id among rows of the given categories, or None.
+        The (category, id) -> row map is rebuilt lazily after rows move.
+        """
+        if self._row_index is None:
+            index = {}
+            rows = zip(self._data[COL_CATEGORY], self._data[COL_ID])
+            for i, (cat, rid) in enumerate(rows):
+                index.setdefault((cat, rid), i)
+            self._row_index = index
+        for cat in categories:
+            i = self._row_index.get((cat, elem_id))
+            if i is not None:
+                return i
+        return None
 
-            if cat == "Pipes":
-                row.DefaultCellStyle.BackColor = Color.LightBlue
-            elif cat == "Pipe Tags":
-                row.DefaultCellStyle.BackColor = Color.LightGreen
-            elif cat == "Pipe Fittings":
-                row.DefaultCellStyle.BackColor = Color.LightGoldenrodYellow
-            elif cat == "Text Notes":
-                row.DefaultCellStyle.BackColor = Color.LightGray
+    def _on_cell_value_needed(self, sender, e):
+        values = self._data[e.ColumnIndex]
+        if e.RowIndex < len(values):
+            e.Value = values[e.RowIndex]
+
+    def _on_cell_value_pushed(self, sender, e):
+        values = self._data[e.ColumnIndex]
+        if e.RowIndex < len(values):
+            values[e.RowIndex] = e.Value
+
+    def _on_cell_formatting(self, sender, e):
+        """Row colour by category, applied to displayed cells only."""
+        cats = self._data[COL_CATEGORY]
+        if e.RowIndex < len(cats):
+            color = CATEGORY_COLORS.get(cats[e.RowIndex])
+            if color is not None:
+                e.CellStyle.BackColor = color
+
+    def _on_cell_begin_edit(self, sender, e):
+        """Keep locked TagStatus cells read-only, wherever their row has moved."""
+        if e.ColumnIndex == COL_TAG_STATUS and self._data[COL_TAG_LOCKED][e.RowIndex]:
+            e.Cancel = True
+
+    def _on_rows_removed(self, sender, e):
+        end = e.RowIndex + e.RowCount
+        for values in self._data:
+            del values[e.RowIndex : end]
+        self._row_index = None
+
+    def _on_column_header_click(self, sender, e):
+        """Sort the backing lists by the clicked column (VirtualMode can't sort)."""
+        column = self.dataGrid.Columns[e.ColumnIndex]
+        descending = column.HeaderCell.SortGlyphDirection == SortOrder.Ascending
+        keys = self._data[e.ColumnIndex]
+        order = sorted(
+            range(len(keys)),
+            key=lambda i: "" if keys[i] is None else str(keys[i]),
+            reverse=descending,
+        )
+        self._data = [[values[i] for i in order] for values in self._data]
+        self._row_index = None
+        for col in self.dataGrid.Columns:
+            col.HeaderCell.SortGlyphDirection = getattr(SortOrder, "None")
+        column.HeaderCell.SortGlyphDirection = (
+            SortOrder.Descending if descending else SortOrder.Ascending
+        )
+        self.dataGrid.Invalidate()
 
     # Smart dynamic spacing
     def rearrange_buttons(self, sender, event):
@@ -526,15 +948,11 @@ class ElementEditorForm(Form):
             ctrl.Location = Point(x, (self.buttonPanel.Height - ctrl.Height) // 2)
             x += ctrl.Width + spacing
 
-    def _add_row(self, data):
-        """Helper to append a new DataGridView row from a dict."""
-        idx = self.dataGrid.Rows.Add()
-        row = self.dataGrid.Rows[idx]
-        for k, v in data.items():
-            row.Cells[k].Value = v
+    def _add_row(self, record):
+        """Helper to append a new DataGridView row from an ElementRecord."""
         # keep the new tag’s button column read-only
-        row.Cells["TagStatus"].Value = "Remove Tag"
-        row.Cells["TagStatus"].ReadOnly = True
+        self._append_record(record, "Remove Tag", True)
+        self.dataGrid.Rows.Add()
 
     def btnPlaceTextNote_Click(self, sender, event):
         text_note_code = self.txtTextNoteCode.Text.strip()
@@ -546,47 +964,40 @@ class ElementEditorForm(Form):
                 "Region elements not available to compute location.", "Error"
             )
             return
-        (region_min, region_max) = get_region_bounding_box(self.regionElements)
+        (region_min, region_max) = get_region_bounding_box(
+            self.regionElements, self.bboxCache
+        )
         corner = region_min
-        ttn = Transaction(doc, "Place Text Note")
-        ttn.Start()
+        # type and options are read before the transaction opens
         note_type = FilteredElementCollector(doc).OfClass(TextNoteType).FirstElement()
-        if note_type:
-            opts = TextNoteOptions(note_type.Id)
-            new_note = TextNote.Create(
-                doc, doc.ActiveView.Id, corner, text_note_code, opts
-            )
-            if new_note:
-                MessageBox.Show("Text Note created successfully.", "Success")
-                self.textNotePlaced = True
-        else:
+        if not note_type:
             MessageBox.Show("No TextNoteType found.", "Error")
+            return
+        opts = TextNoteOptions(note_type.Id)
+        view_id = doc.ActiveView.Id
+        ttn = Transaction(doc, "Place Text Note")
+        ttn.Start()
+        new_note = TextNote.Create(doc, view_id, corner, text_note_code, opts)
         ttn.Commit()
+        if new_note:
+            MessageBox.Show("Text Note created successfully.", "Success")
+            self.textNotePlaced = True
 
     def autoFillPipeTagCodes(self, sender, event):
         # 1) Parse base
         raw = self.txtTextNoteCode.Text.strip()
-        m = re.search(r"([\d\.]+)", raw)
+        m = BASE_CODE_RE.search(raw)
         if not m:
             MessageBox.Show("Could not parse base code from text note.", "Error")
             return
         base = m.group(1)  # e.g. "4.1.1"
 
-        # 2) (optional) keep prefix/base_n split if you want for pipes
-        parts = base.split(".")
-        if len(parts) >= 3:
-            prefix = parts[0] + "." + parts[1]  # "4.1"
-            try:
-                base_n = int(parts[2])  # 1
-            except:
-                base_n = 0
-        else:
-            prefix, base_n = base, 0
-
         # 2) Collect indices
+        # read and write the backing lists directly, then repaint once
+        self.dataGrid.EndEdit()
+        new_codes = self._data[COL_NEW_CODE]
         fit_rows, pipe_rows, tag_rows = [], [], []
-        for i in range(self.dataGrid.Rows.Count):
-            cat = self.dataGrid.Rows[i].Cells["Category"].Value
+        for i, cat in enumerate(self._data[COL_CATEGORY]):
             if cat == "Pipe Fittings":
                 fit_rows.append(i)
             elif cat == "Pipes":
@@ -596,35 +1007,32 @@ class ElementEditorForm(Form):
 
         # Override all Pipe Fittings rows to the base code
         for idx in fit_rows:
-            self.dataGrid.Rows[idx].Cells["NewCode"].Value = base
+            new_codes[idx] = base
 
         # 5) Pipes sorted and numbered: full base + .1,.2...
+        # centers come from the shared bbox cache, so pipes measured while
+        # gathering cost no further Revit calls
+        view = uidoc.ActiveView
+        ids = self._data[COL_ID]
+        pipe_elems = [doc.GetElement(ElementId(ids[i])) for i in pipe_rows]
+        # (x, y, row) tuples sort natively; the row breaks ties in grid order,
+        # as the old stable (X, Y) key sort did
         pipe_centers = []
-        for idx in pipe_rows:
-            rid = int(str(self.dataGrid.Rows[idx].Cells["Id"].Value))
-            elem = doc.GetElement(ElementId(rid))
-            bbox = elem.get_BoundingBox(uidoc.ActiveView)
-            if bbox:
-                ctr = XYZ(
-                    (bbox.Min.X + bbox.Max.X) * 0.5,
-                    (bbox.Min.Y + bbox.Max.Y) * 0.5,
-                    (bbox.Min.Z + bbox.Max.Z) * 0.5,
-                )
-            else:
-                ctr = XYZ(0, 0, 0)
-            pipe_centers.append((idx, ctr))
+        for idx, elem in zip(pipe_rows, pipe_elems):
+            center = get_cached_bbox(elem, view, self.bboxCache)[1] or (0.0, 0.0)
+            pipe_centers.append((center[0], center[1], idx))
 
-        pipe_centers.sort(key=lambda x: (x[1].X, x[1].Y))
-        for i, (idx, _) in enumerate(pipe_centers, 1):
-            self.dataGrid.Rows[idx].Cells["NewCode"].Value = "{}.{}".format(base, i)
+        pipe_centers.sort()
+        codes = ["{}.{}".format(base, i) for i in range(1, len(pipe_centers) + 1)]
+        for code, (_, _, idx) in zip(codes, pipe_centers):
+            new_codes[idx] = code
 
         # 6) Mirror pipe numbering onto pipe‐tag rows (same count)
-        for i, _ in enumerate(pipe_centers, 1):
-            if i - 1 < len(tag_rows):
-                trow = tag_rows[i - 1]
-                self.dataGrid.Rows[trow].Cells["NewCode"].Value = "{}.{}".format(
-                    base, i
-                )
+        for code, trow in zip(codes, tag_rows):
+            new_codes[trow] = code
+
+        # only NewCode changed; repaint that column's visible cells
+        self.dataGrid.InvalidateColumn(COL_NEW_CODE)
 
     def dataGrid_CellContentClick(self, sender, e):
         col = self.dataGrid.Columns[e.ColumnIndex].Name
@@ -636,32 +1044,19 @@ class ElementEditorForm(Form):
         val = row.Cells["TagStatus"].Value
 
         # --- ADD/REMOVE ON PIPES & FITTINGS ---
-        if cat in ("Pipes", "Pipe Fittings"):
-            host_id = int(str(row.Cells["Id"].Value))
+        if cat in TAGGABLE_CATEGORIES:
+            host_id = self._data[COL_ID][e.RowIndex]
             host = doc.GetElement(ElementId(host_id))
 
             # --- ADD TAG ---
             if val == "Add/Place Tag":
-                tr = Transaction(doc, "Add Tag")
-                tr.Start()
-                bb = host.get_BoundingBox(uidoc.ActiveView)
-                if bb:
-                    ctr = XYZ(
-                        (bb.Min.X + bb.Max.X) / 2.0,
-                        (bb.Min.Y + bb.Max.Y) / 2.0,
-                        (bb.Min.Z + bb.Max.Z) / 2.0,
-                    )
-                    ref = Reference(host)
-                    new_tag = IndependentTag.Create(
-                        doc,
-                        doc.ActiveView.Id,
-                        ref,
-                        True,
-                        TagMode.TM_ADDBY_CATEGORY,
-                        TagOrientation.Horizontal,
-                        ctr,
-                    )
-                tr.Commit()
+                created = add_tags_bulk(
+                    doc, uidoc.ActiveView, [host], self.bboxCache, "Add Tag"
+                )
+                if not created:
+                    return
+                new_tag = created[0][1]
+                self.tagsByHost.setdefault(host_id, []).append(new_tag)
 
                 # flip button
                 row.Cells["TagStatus"].Value = "Remove Tag"
@@ -669,191 +1064,119 @@ class ElementEditorForm(Form):
                 # add the new‐tag row here
                 te = doc.GetElement(new_tag.Id)
                 if te:
-                    data = {
-                        "Id": str(te.Id),
-                        "Category": "Pipe Tags",
-                        "Name": te.Name or "",
-                        "DefaultCode": host.LookupParameter("Comments").AsString()
-                        or "",
-                        "NewCode": row.Cells["NewCode"].Value,
-                        "OutsideDiameter": row.Cells["OutsideDiameter"].Value,
-                        "Length": row.Cells["Length"].Value,
-                        "Size": "",
-                        "GEB_Article_Number": "",
-                        "TagStatus": "Yes",
-                    }
-                    self._add_row(data)
+                    record = ElementRecord(
+                        Id=te.Id.IntegerValue,
+                        Category="Pipe Tags",
+                        Name=te.Name or "",
+                        DefaultCode=get_comments(host),
+                        NewCode=row.Cells["NewCode"].Value,
+                        OutsideDiameter=row.Cells["OutsideDiameter"].Value,
+                        Length=row.Cells["Length"].Value,
+                        Size="",
+                        GEB_Article_Number="",
+                        TagStatus="Yes",
+                    )
+                    self._add_row(record)
                 return
 
             # --- REMOVE TAG ---
-            if cat in ("Pipes", "Pipe Fittings") and val == "Remove Tag":
-                host_id = int(str(row.Cells["Id"].Value))
-                deleted_id = None
-
-                # find the matching tag element
-                for t in (
-                    FilteredElementCollector(doc)
-                    .OfCategory(BuiltInCategory.OST_PipeTags)
-                    .WhereElementIsNotElementType()
-                    .ToElements()
-                ):
-                    # unwrap LinkElementId if present
-                    tagged = (
-                        t.GetTaggedElementIds()
-                        if hasattr(t, "GetTaggedElementIds")
-                        else [t.TaggedElementId]
-                    )
-                    for rid in tagged:
-                        # New: handle LinkElementId vs plain ElementId
-                        eid = (
-                            rid.HostElementId.IntegerValue
-                            if hasattr(rid, "HostElementId")
-                            else rid.IntegerValue
-                        )
-                        if eid == host_eid:
-                            deleted_id = t.Id.IntegerValue
-                            tag_elem_id = t.Id
-                            break
-                    if deleted_id:
-                        break
-
-                if deleted_id:
-                    # unsubscribe row-selection highlight
-                    self.dataGrid.SelectionChanged -= self.on_row_selected
+            if val == "Remove Tag":
+                # the host's tags were indexed while gathering; the one we
+                # delete leaves the index only once the delete has committed
+                tags = self.tagsByHost.get(host_id)
+                if not tags:
+                    return
+                tag_elem_id = tags[0].Id
+                deleted_id = tag_elem_id.IntegerValue
+
+                # unsubscribe row-selection highlight
+                self.dataGrid.SelectionChanged -= self.on_row_selected
+                try:
                     # delete the tag in Revit
                     tr = Transaction(doc, "Remove Tag")
                     tr.Start()
-                    doc.Delete(tag_elem_id)
-                    tr.Commit()
+                    try:
+                        doc.Delete(tag_elem_id)
+                        tr.Commit()
+                    except Exception as ex:
+                        # a failed Commit has already ended the transaction
+                        if not tr.HasEnded():
+                            tr.RollBack()
+                        MessageBox.Show(
+                            "Could not remove the tag:\n{}".format(ex), "Error"
+                        )
+                        return
+                    tags.pop(0)
                     # flip the host's button back to Add/Place
                     row.Cells["TagStatus"].Value = "Add/Place Tag"
-                    row.Cells["TagStatus"].ReadOnly = False
+                    self._data[COL_TAG_LOCKED][e.RowIndex] = False
                     # remove its Pipe-Tags row
-                    for i in range(self.dataGrid.Rows.Count):
-                        r2 = self.dataGrid.Rows[i]
-                        if (
-                            r2.Cells["Category"].Value == "Pipe Tags"
-                            and int(str(r2.Cells["Id"].Value)) == deleted_id
-                        ):
-                            self.dataGrid.Rows.RemoveAt(i)
-                            break
+                    i = self._find_row(deleted_id, ("Pipe Tags",))
+                    if i is not None:
+                        self.dataGrid.Rows.RemoveAt(i)
+                finally:
                     self.dataGrid.SelectionChanged += self.on_row_selected
                 return
 
         # --- REMOVE AN ORPHAN PIPE-TAG ROW ---
         if cat == "Pipe Tags" and val == "Remove Tag":
             # Figure out who the host pipe was (while the tag still exists)
-            tag_id = ElementId(int(str(row.Cells["Id"].Value)))
+            tag_id = ElementId(self._data[COL_ID][e.RowIndex])
             self.dataGrid.SelectionChanged -= self.on_row_selected
             try:
                 tag_elem = doc.GetElement(tag_id)
-                host_id = None
-                if tag_elem:
-                    if hasattr(tag_elem, "GetTaggedElementIds"):
-                        ids = tag_elem.GetTaggedElementIds()
-                        if ids and ids.Count:
-                            # if this is a LinkedElementId, use its HostElementId
-                            rid = ids[0]
-                            host_id = (
-                                rid.HostElementId.IntegerValue
-                                if hasattr(rid, "HostElementId")
-                                else rid.IntegerValue
-                            )
-                    elif hasattr(tag_elem, "TaggedElementId"):
-                        rid = tag_elem.TaggedElementId
-                        host_id = (
-                            rid.HostElementId.IntegerValue
-                            if hasattr(rid, "HostElementId")
-                            else rid.IntegerValue
-                        )
+                host_ids = get_tagged_host_ids(tag_elem) if tag_elem else []
+                host_id = host_ids[0] if host_ids else None
 
                 # Delete the Tag
                 tr = Transaction(doc, "Remove Pipe-Tag")
                 tr.Start()
-                doc.Delete(tag_id)
-                tr.Commit()
+                try:
+                    doc.Delete(tag_id)
+                    tr.Commit()
+                except Exception as ex:
+                    # a failed Commit has already ended the transaction
+                    if not tr.HasEnded():
+                        tr.RollBack()
+                    MessageBox.Show("Could not remove the tag:\n{}".format(ex), "Error")
+                    return
+
+                # the tag is gone; drop it from its hosts' index entries
+                for hid in host_ids:
+                    tags = self.tagsByHost.get(hid)
+                    if tags:
+                        tags[:] = [t for t in tags if t.Id != tag_id]
 
                 # Remove the tags row
                 self.dataGrid.Rows.RemoveAt(e.RowIndex)
 
                 # Now find the pipe's row and flip it back to "Add/Place Tag"
                 if host_id:
-                    for i in range(self.dataGrid.Rows.Count):
+                    i = self._find_row(host_id, TAGGABLE_CATEGORIES)
+                    if i is not None:
                         pr = self.dataGrid.Rows[i]
-                        if int(str(pr.Cells["Id"].Value)) == host_id and pr.Cells[
-                            "Category"
-                        ].Value in ("Pipes", "Pipe Fittings"):
-                            pr.Cells["TagStatus"].Value = "Add/Place Tag"
-                            pr.Cells["TagStatus"].ReadOnly = False
-                            break
+                        pr.Cells["TagStatus"].Value = "Add/Place Tag"
+                        self._data[COL_TAG_LOCKED][i] = False
             finally:
                 # rehook highlight
                 self.dataGrid.SelectionChanged += self.on_row_selected
             return
 
-        # --- PIPE FITTINGS ---
-        elif cat == "Pipe Fittings" and val == "Add/Place Tag":
-            # from Autodesk.Revit.DB import IndependentTag, Transaction, Reference
-            elem_id = ElementId(int(str(row.Cells["Id"].Value)))
-            fitting_elem = doc.GetElement(elem_id)
-
-            t3 = Transaction(doc, "Add Fitting Tag")
-            t3.Start()
-            bbox = fitting_elem.get_BoundingBox(uidoc.ActiveView)
-            if bbox:
-                center = XYZ(
-                    (bbox.Min.X + bbox.Max.X) / 2.0,
-                    (bbox.Min.Y + bbox.Max.Y) / 2.0,
-                    (bbox.Min.Z + bbox.Max.Z) / 2.0,
-                )
-                ref = Reference(fitting_elem)
-                new_tag = IndependentTag.Create(
-                    doc,
-                    doc.ActiveView.Id,
-                    ref,
-                    True,
-                    TagMode.TM_ADDBY_CATEGORY,
-                    TagOrientation.Horizontal,
-                    center,
-                )
-            t3.Commit()
-
-            row.Cells["TagStatus"].Value = "Yes"
-
-            new_tag_elem = doc.GetElement(new_tag.Id)
-            if new_tag_elem:
-                tag_dict = {
-                    "Id": str(new_tag_elem.Id),
-                    "Category": "Pipe Tags",
-                    "Name": new_tag_elem.Name or "",
-                    "DefaultCode": fitting_elem.LookupParameter("Comments").AsString()
-                    or "",
-                    "NewCode": row.Cells["NewCode"].Value,
-                    "OutsideDiameter": row.Cells["OutsideDiameter"].Value,
-                    "Length": row.Cells["Length"].Value,
-                    "TagStatus": "Yes",
-                }
-                new_row_idx = self.dataGrid.Rows.Add()
-                new_row = self.dataGrid.Rows[new_row_idx]
-                for key, v in tag_dict.items():
-                    new_row.Cells[key].Value = v
-                new_row.Cells["TagStatus"].Value = "Remove Tag"
-                new_row.Cells["TagStatus"].ReadOnly = True
-
     def okButton_Click(self, sender, event):
-        updated_data = []
-        for row in self.dataGrid.Rows:
-            entry = {
-                "Id": row.Cells["Id"].Value,
-                "Category": row.Cells["Category"].Value,
-                "Name": row.Cells["Name"].Value,
-                "DefaultCode": row.Cells["DefaultCode"].Value,
-                "NewCode": row.Cells["NewCode"].Value,
-                "OutsideDiameter": row.Cells["OutsideDiameter"].Value,
-                "Length": row.Cells["Length"].Value,
-                "TagStatus": row.Cells["TagStatus"].Value,
-            }
-            updated_data.append(entry)
+        # serialise straight from the backing lists; no grid cells are touched
+        self.dataGrid.EndEdit()
+        keys = (
+            "Id",
+            "Category",
+            "Name",
+            "DefaultCode",
+            "NewCode",
+            "OutsideDiameter",
+            "Length",
+            "TagStatus",
+        )
+        columns = [self._data[GRID_COLUMNS.index(k)] for k in keys]
+        updated_data = [dict(zip(keys, values)) for values in zip(*columns)]
 
         self.Result = {
             "Elements": updated_data,
@@ -864,17 +1187,29 @@ class ElementEditorForm(Form):
         self.Close()
 
     def on_row_selected(self, sender, event):
-        """When the user clicks or arrows to a row, select that element in Revit."""
+        """
+        When the user clicks or arrows to a row, select that element in Revit.
+        The selection is debounced, so arrowing through many rows ends in a
+        single SetElementIds for the row the user stops on. The element id is
+        kept rather than the row index, since rows may be removed or sorted
+        before the timer fires.
+        """
         row = self.dataGrid.CurrentRow
-        if not row:
-            return
-        id_val = row.Cells["Id"].Value
-        if not id_val:
+        ids = self._data[COL_ID]
+        self._pendingId = ids[row.Index] if row and row.Index < len(ids) else None
+        self._selTimer.Stop()
+        self._selTimer.Start()
+
+    def _flush_selection(self, sender, event):
+        self._selTimer.Stop()
+        pending = self._pendingId
+        self._pendingId = None
+        if pending is None:
             return
 
-        # try to parse and highlight, but swallow any invalid-object errors
+        # highlight, but swallow any invalid-object errors
         try:
-            eid = ElementId(int(str(id_val)))
+            eid = ElementId(pending)
             elem = doc.GetElement(eid)
             # guard against deleted/invalid elements
             if elem and elem.IsValidObject:
@@ -883,8 +1218,10 @@ class ElementEditorForm(Form):
             return
 
 
-def show_element_editor(elements_data, region_elements=None):
-    form = ElementEditorForm(elements_data, region_elements)
+def show_element_editor(
+    elements_data, region_elements=None, bbox_cache=None, tags_by_host=None
+):
+    form = ElementEditorForm(elements_data, region_elements, bbox_cache, tags_by_host)
     if form.ShowDialog() == DialogResult.OK:
         return form.Result
     return None
@@ -893,19 +1230,75 @@ def show_element_editor(elements_data, region_elements=None):
 # ==================================================
 # Filter Gathered Elements to Relevant Categories
 # ==================================================
-def filter_relevant_elements(gathered_elements):
+def get_tagged_host_ids(tag):
     """
-    Build a list of dicts with keys:
-     "Id","Category","Name","DefaultCode","NewCode",
-     "OutsideDiameter","Length","GEB_Article_Number","TagStatus"
+    Integer ids of the elements a tag points at. Handles both the older
+    TaggedElementId property and GetTaggedElementIds(), whose items are
+    LinkElementIds on newer Revit versions.
     """
+    host_ids = []
+    try:
+        if hasattr(tag, "GetTaggedElementIds"):
+            for tid in tag.GetTaggedElementIds():
+                eid = getattr(tid, "HostElementId", tid)
+                if eid:
+                    host_ids.append(eid.IntegerValue)
+        elif hasattr(tag, "TaggedElementId"):
+            eid = getattr(tag.TaggedElementId, "HostElementId", tag.TaggedElementId)
+            if eid:
+                host_ids.append(eid.IntegerValue)
+    except:
+        pass
+    return host_ids
+
+
+def get_comments(elem):
+    param = elem.get_Parameter(BuiltInParameter.ALL_MODEL_INSTANCE_COMMENTS)
+    return (param.AsString() if param else None) or ""
+
+
+def get_pipe_param_strings(pipe, cache):
+    """
+    (comments, outside diameter, length) strings for a pipe, read through
+    built-in parameters and memoised by element id.
+    """
+    key = pipe.Id.IntegerValue
+    entry = cache.get(key)
+    if entry is None:
+        entry = (
+            get_comments(pipe),
+            convert_param_to_string(
+                pipe.get_Parameter(BuiltInParameter.RBS_PIPE_OUTER_DIAMETER)
+            ),
+            convert_param_to_string(
+                pipe.get_Parameter(BuiltInParameter.CURVE_ELEM_LENGTH)
+            ),
+        )
+        cache[key] = entry
+    return entry
+
+
+def filter_relevant_elements(gathered_elements, pipes=None, tags_by_host=None):
+    """
+    Build a list of ElementRecords with fields:
+     Id, Category, Name, DefaultCode, NewCode,
+     OutsideDiameter, Length, Size, GEB_Article_Number, TagStatus
+
+    pipes is the pipe bucket from select_boundary_and_gather, if available.
+    tags_by_host, if given, is filled with host id -> pipe tags for the editor.
+    """
+    if tags_by_host is None:
+        tags_by_host = {}
     relevant = []
 
-    pipe_ids = {
-        e.Id.IntegerValue
-        for e in gathered_elements
-        if e.Category and e.Category.Name == "Pipes"
-    }
+    if pipes is not None:
+        pipe_ids = {e.Id.IntegerValue for e in pipes}
+    else:
+        pipe_ids = {
+            e.Id.IntegerValue
+            for e in gathered_elements
+            if e.Category and e.Category.Name == "Pipes"
+        }
     # grab all tags in the view
     all_pipe_tags = (
         FilteredElementCollector(doc)
@@ -914,53 +1307,54 @@ def filter_relevant_elements(gathered_elements):
         .ToElements()
     )
 
-    # pull in any tags whose host pipe was in our region
+    seen_ids = set()
+    pipe_params = {}
+    get_element = doc.GetElement
+    append = relevant.append
+
+    # one pass over the tags: index them by host id, and pull in any tag
+    # whose host pipe was in our region
     for tag in all_pipe_tags:
+        host_ids = get_tagged_host_ids(tag)
+        for hid in host_ids:
+            tags_by_host.setdefault(hid, []).append(tag)
+        if not host_ids or host_ids[0] not in pipe_ids:
+            continue
+        tag_int = tag.Id.IntegerValue
+        if tag_int in seen_ids:
+            continue
         try:
-            host = None
-            if hasattr(tag, "GetTaggedElementIds"):
-                ids = tag.GetTaggedElementIds()
-                if ids and ids.Count > 0:
-                    host = doc.GetElement(ids[0])
-            elif hasattr(tag, "TaggedElementId"):
-                host = doc.GetElement(tag.TaggedElementId)
-            if host and host.Id.IntegerValue in pipe_ids:
-                # and only if we haven't already added it in gathered_elements
-                if not any(str(tag.Id) == d["Id"] for d in relevant):
-                    # build your dict exactly like you do for pipe‑tags below
-                    relevant.append(
-                        {
-                            "Id": str(tag.Id),
-                            "Category": "Pipe Tags",
-                            "Name": tag.Name or "",
-                            "DefaultCode": host.LookupParameter("Comments").AsString()
-                            or "",
-                            "NewCode": host.LookupParameter("Comments").AsString()
-                            or "",
-                            "OutsideDiameter": convert_param_to_string(
-                                host.LookupParameter("Outside Diameter")
-                            ),
-                            "Length": convert_param_to_string(
-                                host.LookupParameter("Length")
-                            ),
-                            "Size": "",  # if you want
-                            "GEB_Article_Number": "",
-                            "TagStatus": "Yes",
-                        }
-                    )
+            host = get_element(ElementId(host_ids[0]))
+            comments, outside_diam, length_val = get_pipe_param_strings(
+                host, pipe_params
+            )
+            # build the record exactly like you do for pipe‑tags below
+            append(
+                ElementRecord(
+                    Id=tag_int,
+                    Category="Pipe Tags",
+                    Name=tag.Name or "",
+                    DefaultCode=comments,
+                    NewCode=comments,
+                    OutsideDiameter=outside_diam,
+                    Length=length_val,
+                    Size="",  # if you want
+                    GEB_Article_Number="",
+                    TagStatus="Yes",
+                )
+            )
+            seen_ids.add(tag_int)
         except:
             pass
 
     for e in gathered_elements:
-        if not e.Category:
-            continue
+        # the gather collector only returns the four editor categories
         cat = e.Category.Name
-        if cat not in ("Pipes", "Pipe Fittings", "Pipe Tags", "Text Notes"):
+        eid = e.Id.IntegerValue
+        # tags already pulled in through their host pipe
+        if eid in seen_ids:
             continue
 
-        com = e.LookupParameter("Comments")
-        default_code = com.AsString() if com and com.AsString() else ""
-
         # initialize
         outside_diam = ""
         length_val = ""
@@ -969,31 +1363,16 @@ def filter_relevant_elements(gathered_elements):
 
         # --- Pipes ---
         if cat == "Pipes":
-            odp = e.LookupParameter("Outside Diameter")
-            lp = e.LookupParameter("Length")
-            outside_diam = convert_param_to_string(odp)
-            length_val = convert_param_to_string(lp)
+            default_code, outside_diam, length_val = get_pipe_param_strings(
+                e, pipe_params
+            )
 
             # detect existing tags
-            tag_status = "No"
-            for tag in all_pipe_tags:
-                try:
-                    tagged_ids = []
-                    if hasattr(tag, "GetTaggedElementIds"):
-                        tagged_ids = tag.GetTaggedElementIds()
-                    elif hasattr(tag, "TaggedElementId"):
-                        tagged_ids = [tag.TaggedElementId]
-                    for tid in tagged_ids:
-                        if tid and tid.IntegerValue == e.Id.IntegerValue:
-                            tag_status = "Yes"
-                            break
-                    if tag_status == "Yes":
-                        break
-                except:
-                    pass
+            tag_status = "Yes" if eid in tags_by_host else "No"
 
         # --- Pipe Fittings ---
         elif cat == "Pipe Fittings":
+            default_code = get_comments(e)
             # diameter (try several names)
             for pname in ("Outside Diameter", "Diameter", "Nominal Diameter"):
                 p = e.LookupParameter(pname)
@@ -1016,25 +1395,17 @@ def filter_relevant_elements(gathered_elements):
         # --- Pipe Tags ---
         elif cat == "Pipe Tags":
             tag_status = "Yes"
-            host = None
-            try:
-                if hasattr(e, "GetTaggedElementIds"):
-                    ids = e.GetTaggedElementIds()
-                    if ids and ids.Count > 0:
-                        host = doc.GetElement(ids[0])
-                if not host and hasattr(e, "TaggedElementId"):
-                    host = doc.GetElement(e.TaggedElementId)
-            except:
-                host = None
+            # host ids come unwrapped from LinkElementIds on newer Revit
+            host_ids = get_tagged_host_ids(e)
+            host = get_element(ElementId(host_ids[0])) if host_ids else None
 
+            default_code = get_comments(e)
             if host:
-                odp = host.LookupParameter("Outside Diameter")
-                lp = host.LookupParameter("Length")
-                outside_diam = convert_param_to_string(odp)
-                length_val = convert_param_to_string(lp)
+                outside_diam, length_val = get_pipe_param_strings(host, pipe_params)[1:]
 
         # --- Text Notes & others ---
         else:
+            default_code = get_comments(e)
             tag_status = ""
 
         size_val = ""
@@ -1042,19 +1413,19 @@ def filter_relevant_elements(gathered_elements):
             param_size = e.LookupParameter("Size")
             size_val = convert_param_to_string(param_size)
 
-        relevant.append(
-            {
-                "Id": str(e.Id),
-                "Category": cat,
-                "Name": e.Name if hasattr(e, "Name") else "",
-                "DefaultCode": default_code,
-                "NewCode": default_code,
-                "OutsideDiameter": outside_diam,
-                "Length": length_val,
-                "Size": size_val,
-                "GEB_Article_Number": art_num,
-                "TagStatus": tag_status,
-            }
+        append(
+            ElementRecord(
+                Id=eid,
+                Category=cat,
+                Name=e.Name if hasattr(e, "Name") else "",
+                DefaultCode=default_code,
+                NewCode=default_code,
+                OutsideDiameter=outside_diam,
+                Length=length_val,
+                Size=size_val,
+                GEB_Article_Number=art_num,
+                TagStatus=tag_status,
+            )
         )
 
     return relevant
@@ -1063,101 +1434,120 @@ def filter_relevant_elements(gathered_elements):
 # ==================================================
 # MAIN WORKFLOW
 # ==================================================
-gathered_elements = select_boundary_and_gather()
+bbox_cache = {}
+gathered, gather_stats = select_boundary_and_gather(bbox_cache)
+notify_gather_stats(gather_stats)
+gathered_elements = gathered.elements if gathered is not None else None
 if gathered_elements is None or len(gathered_elements) == 0:
     MessageBox.Show("No elements were gathered. Operation cancelled.", "Error")
     sys.exit("Operation cancelled by the user.")
 
-filtered_elements = filter_relevant_elements(gathered_elements)
+tags_by_host = {}
+filtered_elements = filter_relevant_elements(
+    gathered_elements, gathered.pipes, tags_by_host
+)
 if len(filtered_elements) == 0:
     MessageBox.Show("No relevant elements found in the selected region.", "Error")
     sys.exit("Operation cancelled by the user.")
 
-result = show_element_editor(filtered_elements, region_elements=gathered_elements)
+result = show_element_editor(
+    filtered_elements,
+    region_elements=gathered_elements,
+    bbox_cache=bbox_cache,
+    tags_by_host=tags_by_host,
+)
 if result is None:
     sys.exit("Operation cancelled by the user.")
 
+# the active view, read once for the renumbering, the text note and the plan copy
+active_view = uidoc.ActiveView
+
 baseCode = result["TextNote"]
 for eData in result["Elements"]:
     if eData["Category"] == "Pipe Fittings":
         eData["NewCode"] = baseCode
 
+# resolve every edited element once; renumbering and the Comments write share it
+get_element = doc.GetElement
+elems_by_id = {}
+for eData in result["Elements"]:
+    # ids come back from the editor as ints; skip rows without one
+    eid = eData.get("Id")
+    if eid is None:
+        continue
+    elems_by_id[eid] = get_element(ElementId(eid))
+
 # --- Renumber Pipes based on region order (sorted left-to-right, bottom-to-up) ---
 if not result.get("TextNotePlaced", False):
     base_raw = result.get("TextNote", "").strip()
-    m = re.search(r"([\d\.]+)", base_raw)
+    m = BASE_CODE_RE.search(base_raw)
     base = m.group(1) if m else "0"
 
     pipe_entries = []
     for idx, eData in enumerate(result["Elements"]):
         if eData["Category"] == "Pipes":
-            elem = doc.GetElement(ElementId(int(str(eData["Id"]))))
+            elem = elems_by_id.get(eData["Id"])
             if elem:
-                bbox = elem.get_BoundingBox(uidoc.ActiveView)
-                if bbox:
-                    center = XYZ(
-                        (bbox.Min.X + bbox.Max.X) / 2.0,
-                        (bbox.Min.Y + bbox.Max.Y) / 2.0,
-                        (bbox.Min.Z + bbox.Max.Z) / 2.0,
-                    )
-                    pipe_entries.append((idx, center))
-    pipe_entries.sort(key=lambda x: (x[1].X, x[1].Y))
+                # centers are plain tuples from the shared bbox cache
+                center = get_cached_bbox(elem, active_view, bbox_cache)[1]
+                if center:
+                    pipe_entries.append((idx, center[0], center[1]))
+    pipe_entries.sort(key=itemgetter(1, 2))
 
-    ctr = 1
-    for i, _ in pipe_entries:
-        result["Elements"][i]["NewCode"] = base + "." + str(ctr)
-        ctr += 1
+    for ctr, (i, _, _) in enumerate(pipe_entries, 1):
+        result["Elements"][i]["NewCode"] = "{}.{}".format(base, ctr)
 
     for eData in result["Elements"]:
         if eData["Category"] == "Pipe Fittings":
             eData["NewCode"] = base
 
 # --- Update the elements' "Comments" from the DataGridView ---
-t = Transaction(doc, "Update Comments")
-t.Start()
+# look every Comments parameter up before the transaction; inside it only Set runs
+comment_writes = []
 for eData in result["Elements"]:
-    # skip rows where Id is missing or not an integer
-    id_val = eData.get("Id")
-    try:
-        eid = int(str(id_val))
-    except (TypeError, ValueError):
-        continue
-
-    elem = doc.GetElement(ElementId(eid))
+    elem = elems_by_id.get(eData.get("Id"))
     if not elem:
         continue
     # get the Comments parameter
-    p = elem.LookupParameter("Comments")
+    p = elem.get_Parameter(BuiltInParameter.ALL_MODEL_INSTANCE_COMMENTS)
     if not p or p.IsReadOnly:
         continue
 
     # if this is a fitting, force it to the base sheet code
     if eData["Category"] == "Pipe Fittings":
         # result ["TextNote"] holds exactly the text you placed e.g. "5.1.1"
-        p.Set(result["TextNote"])
+        comment_writes.append((p, result["TextNote"]))
     else:
         # pipes & tags keep their full NewCode
-        p.Set(str(eData["NewCode"]))
-t.Commit()
+        comment_writes.append((p, str(eData["NewCode"])))
 
-# --- Place the text note if not already placed ---
-if not result.get("TextNotePlaced", False):
-    (region_min, region_max) = get_region_bounding_box(gathered_elements)
-    view = doc.ActiveView
-    corner = region_min
-    ttn = Transaction(doc, "Place Text Note at Region Corner")
-    ttn.Start()
+# region extent, shared by the text note, the plan crop and the 3D section box
+region_min, region_max = get_region_bounding_box(gathered_elements, bbox_cache)
+
+# text note type and options are read before the transaction; only writes run inside
+place_note = not result.get("TextNotePlaced", False)
+note_opts = None
+if place_note:
     nt = FilteredElementCollector(doc).OfClass(TextNoteType).FirstElement()
     if nt:
-        opts = TextNoteOptions(nt.Id)
+        note_opts = TextNoteOptions(nt.Id)
+
+# Comments and the region text note are written in one transaction
+t = Transaction(doc, "Update Comments and Text Note")
+t.Start()
+for p, value in comment_writes:
+    p.Set(value)
+
+# --- Place the text note if not already placed ---
+if place_note:
+    corner = region_min
+    if note_opts:
         TextNote.Create(
-            doc, doc.ActiveView.Id, corner, result.get("TextNote", base), opts
+            doc, active_view.Id, corner, result.get("TextNote", base), note_opts
         )
-    ttn.Commit()
-
-region_min, region_max = get_region_bounding_box(gathered_elements)
+t.Commit()
 
-orig = uidoc.ActiveView
+orig = active_view
 if orig.ViewType != ViewType.FloorPlan:
     MessageBox.Show("Active view is not a Floor Plan!", "Error")
     sys.exit()
@@ -1181,7 +1571,7 @@ new_view.Discipline = ViewDiscipline.Coordination
 new_view.Scale = 25
 
 # naming, cropping, discipline etc...
-m = re.search(r"([\d\.]+)", result["TextNote"])
+m = BASE_CODE_RE.search(result["TextNote"])
 base = m.group(1) if m else result["TextNote"].strip()  # "5.1.1"
 try:
     new_view.Name = base
@@ -1215,12 +1605,12 @@ tx.Commit()
 # 2) SHOW TITLE-BLOCK PICKER, THEN CREATE SHEET
 # -----------------------------------------
 
-# collect title‑blocks
+# collect title‑blocks; list() walks the collector once, with no
+# intermediate ToElements() IList
 all_tbs = list(
     FilteredElementCollector(doc)
     .OfCategory(BuiltInCategory.OST_TitleBlocks)
     .OfClass(FamilySymbol)
-    .ToElements()
 )
 
 if not all_tbs:
@@ -1229,51 +1619,101 @@ if not all_tbs:
 
 
 class TBPicker(Form):
+    # fixed layout, built once when the class is defined
+    _CLIENT_SIZE = Size(300, 350)
+    _LIST_BOUNDS = Rectangle(10, 10, 280, 280)
+    _OK_LOCATION = Point(10, 300)
+    _CANCEL_LOCATION = Point(100, 300)
+
     def __init__(self, tbs):
         self.tbs = tbs
         self.Text = "Choose a Title‑Block"
-        self.ClientSize = Size(300, 350)
-
-        # ListBox
-        self.lb = ListBox()
-        self.lb.Bounds = Rectangle(10, 10, 280, 280)
-        for sym in tbs:
-            fam = sym.FamilyName
-            type_name = (
-                sym.get_Parameter(BuiltInParameter.SYMBOL_NAME_PARAM).AsString() or ""
-            )
-            self.lb.Items.Add(fam + " - " + type_name)
+        self.ClientSize = TBPicker._CLIENT_SIZE
+
+        # virtual list: a label is built only when its row is first drawn
+        self._items = {}
+        self.lb = ListView()
+        self.lb.Bounds = TBPicker._LIST_BOUNDS
+        self.lb.View = ListViewMode.Details
+        self.lb.HeaderStyle = getattr(ColumnHeaderStyle, "None")
+        self.lb.FullRowSelect = True
+        self.lb.MultiSelect = False
+        self.lb.HideSelection = False
+        self.lb.Columns.Add("Title block", 255)
+        self.lb.VirtualMode = True
+        self.lb.RetrieveVirtualItem += self._on_retrieve_item
+        self.lb.VirtualListSize = len(tbs)
         self.Controls.Add(self.lb)
 
         # OK / Cancel
-        ok = Button(Text="OK", DialogResult=DialogResult.OK, Location=Point(10, 300))
+        ok = Button(
+            Text="OK", DialogResult=DialogResult.OK, Location=TBPicker._OK_LOCATION
+        )
         ca = Button(
-            Text="Cancel", DialogResult=DialogResult.Cancel, Location=Point(100, 300)
+            Text="Cancel",
+            DialogResult=DialogResult.Cancel,
+            Location=TBPicker._CANCEL_LOCATION,
         )
         self.Controls.Add(ok)
         self.Controls.Add(ca)
         self.AcceptButton = ok
         self.CancelButton = ca
 
-
-existing_sheets = FilteredElementCollector(doc).OfClass(ViewSheet).ToElements()
-existing_numbers = {s.SheetNumber for s in existing_sheets}
+    def _on_retrieve_item(self, sender, e):
+        item = self._items.get(e.ItemIndex)
+        if item is None:
+            sym = self.tbs[e.ItemIndex]
+            # Element.Name read through the base-class property; FamilySymbol
+            # shadows .Name in IronPython
+            name = Element.Name.GetValue(sym) or ""
+            item = ListViewItem(sym.FamilyName + " - " + name)
+            self._items[e.ItemIndex] = item
+        e.Item = item
+
+    def selected_index(self):
+        indices = self.lb.SelectedIndices
+        return indices[0] if indices.Count else -1
+
+
+# only one number is needed, so stop at the first sheet that already uses it
+sheet_number_taken = any(
+    s.SheetNumber == base for s in FilteredElementCollector(doc).OfClass(ViewSheet)
+)
 
 # show the picker
 picker = TBPicker(all_tbs)
-if picker.ShowDialog() != DialogResult.OK or picker.lb.SelectedIndex < 0:
+if picker.ShowDialog() != DialogResult.OK or picker.selected_index() < 0:
     MessageBox.Show("Sheet creation cancelled.", "Info")
     sys.exit()
 
-title_block = all_tbs[picker.lb.SelectedIndex]
+title_block = all_tbs[picker.selected_index()]
 
 # ————————————————————————————————
 # 3) Create A3 sheets, skipping duplicates
 # ————————————————————————————————
 
+# view lookups for the 3D callout, collected once rather than per base
+v3d_type = next(
+    v
+    for v in FilteredElementCollector(doc).OfClass(ViewFamilyType)
+    if v.ViewFamily == ViewFamily.ThreeDimensional
+)
+all3d_views = FilteredElementCollector(doc).OfClass(View3D).ToElements()
+# "<base> - Sheet ..." names counted per base
+sheet_view_counts = defaultdict(int)
+for v in all3d_views:
+    head, sep, _ = v.Name.partition(" - Sheet")
+    if sep:
+        sheet_view_counts[head] += 1
+# A00_Algemeen 3D view template, looked up once for every sheet
+tmpl_id = next(
+    (v.Id for v in all3d_views if v.IsTemplate and v.Name == "S4R_A00_Algemeen_3D"),
+    ElementId.InvalidElementId,
+)
+
 # b) for each base, only create if it’s not already on a sheet
 for base in {base}:  # e.g. 5.1.1
-    if base in existing_numbers:
+    if sheet_number_taken:
         MessageBox.Show(
             "Sheet 'prefab {0}' already exists!\n\n"
             "Please pick a different code in the text-note editor.".format(base),
@@ -1293,13 +1733,8 @@ for base in {base}:  # e.g. 5.1.1
     # ------------------------------------------
     # 4) Create & place 3D callout
     # ------------------------------------------
-    all3ds = FilteredElementCollector(doc).OfClass(ViewFamilyType).ToElements()
-    all3d_views = FilteredElementCollector(doc).OfClass(View3D).ToElements()
-    # 1. pick a 3D ViewFamilyType
-    prefix = "{} - Sheet".format(base)
-    existing_count = sum(1 for v in all3d_views if v.Name.startswith(prefix))
-
-    v3d_type = next(v for v in all3ds if v.ViewFamily == ViewFamily.ThreeDimensional)
+    # 1. the 3D ViewFamilyType was picked above
+    existing_count = sheet_view_counts[base]
 
     # split off the last number of the base code
     parts = base.split(".")
@@ -1308,38 +1743,46 @@ for base in {base}:  # e.g. 5.1.1
     new_last = last + existing_count
     sheet_suffix = "{}.{}".format(major, new_last)
 
-    # 2. create an isometric 3D view
-    view3d = View3D.CreateIsometric(doc, v3d_type.Id)
-    view3d.Name = "{} - Sheet {}".format(base, sheet_suffix)
-    # force it into the Architectural branch of the browser
-    view3d.Discipline = ViewDiscipline.Architectural
-    view3d.Scale = 25
-
-    # apply your A00_Algemeen 3D View Template
-    tmpl = next(
-        (v for v in all3d_views if v.IsTemplate and v.Name == "S4R_A00_Algemeen_3D"),
-        None,
-    )
-    if tmpl:
-        view3d.ViewTemplateId = tmpl.Id
-
-    param = view3d.get_Parameter(BuiltInParameter.VIEW_DISCIPLINE)
-    if not param.IsReadOnly:
-        param.Set(int(ViewDiscipline.Architectural))
-
-    # 3. use the same region bounding box you computed earlier
-    section_bb = BoundingBoxXYZ()
-    section_bb.Min = region_min
-    section_bb.Max = region_max
-    view3d.SetSectionBox(section_bb)
-
-    # 4. position the 3D viewport on the sheet (to the right of the floor plan)
-    o = sheet.Outline
-    # push it over 1/3 of the sheet width, and up a bit
-    u = o.Min.U + (o.Max.U - o.Min.U) * 0.65
-    v = o.Min.V + (o.Max.V - o.Min.V) * 0.35
-
-    Viewport.Create(doc, sheet.Id, view3d.Id, XYZ(u, v, 0))
+    # the 3D callout runs in its own sub-transaction, so a failure there
+    # (e.g. a clashing view name) leaves the sheet and plan viewport in place
+    st = SubTransaction(doc)
+    st.Start()
+    try:
+        # 2. create an isometric 3D view
+        view3d = View3D.CreateIsometric(doc, v3d_type.Id)
+        view3d.Name = "{} - Sheet {}".format(base, sheet_suffix)
+        # force it into the Architectural branch of the browser
+        view3d.Discipline = ViewDiscipline.Architectural
+        view3d.Scale = 25
+
+        # apply your A00_Algemeen 3D View Template
+        if tmpl_id != ElementId.InvalidElementId:
+            view3d.ViewTemplateId = tmpl_id
+
+        param = view3d.get_Parameter(BuiltInParameter.VIEW_DISCIPLINE)
+        if not param.IsReadOnly:
+            param.Set(int(ViewDiscipline.Architectural))
+
+        # 3. use the same region bounding box you computed earlier
+        section_bb = BoundingBoxXYZ()
+        section_bb.Min = region_min
+        section_bb.Max = region_max
+        view3d.SetSectionBox(section_bb)
+
+        # 4. position the 3D viewport on the sheet (to the right of the floor plan)
+        o = sheet.Outline
+        # push it over 1/3 of the sheet width, and up a bit
+        u = o.Min.U + (o.Max.U - o.Min.U) * 0.65
+        v = o.Min.V + (o.Max.V - o.Min.V) * 0.35
+
+        Viewport.Create(doc, sheet.Id, view3d.Id, XYZ(u, v, 0))
+        st.Commit()
+    except Exception as ex:
+        st.RollBack()
+        MessageBox.Show(
+            "The 3D view for sheet {0} could not be created:\n{1}".format(base, ex),
+            "Warning",
+        )
 
     t3.Commit()
 